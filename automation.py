@@ -7,24 +7,193 @@ This script automates the e-commerce purchase process using Selenium.
 """
 
 import json
+import logging
 import time
 import os
 import platform
 from datetime import datetime, timedelta
 import pickle
 import urllib.parse
+import glob
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Suppress debug logs
 import warnings
 warnings.filterwarnings("ignore")
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'  # Suppress TensorFlow logs
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+from capture import StepCapture
+from run_log import logger, log_event, new_run, set_step, setup_logging, flush_logging
+from diagnostics import FailureDiagnostics
+from history import RunHistory, DEFAULT_TIMEOUT, load_timeout_overrides
+
+# Selenium, webdriver-manager and psutil are slow to import, so they are loaded
+# by load_browser_modules() only once a browser is actually needed
+webdriver = By = WebDriverWait = EC = Service = Options = None
+TimeoutException = NoSuchElementException = StaleElementReferenceException = None
+ChromeDriverManager = None
+psutil = None
+_browser_modules_lock = threading.Lock()
+
+def load_browser_modules():
+    """Import the browser automation modules on first use"""
+    global webdriver, By, WebDriverWait, EC, Service, Options
+    global TimeoutException, NoSuchElementException, StaleElementReferenceException
+    global ChromeDriverManager, psutil
+
+    if webdriver is not None:
+        return
+
+    with _browser_modules_lock:
+        if webdriver is not None:
+            return
+
+        from selenium.webdriver.common.by import By as _By
+        from selenium.webdriver.support.ui import WebDriverWait as _WebDriverWait
+        from selenium.webdriver.support import expected_conditions as _EC
+        from selenium.webdriver.chrome.service import Service as _Service
+        from selenium.webdriver.chrome.options import Options as _Options
+        from selenium.common.exceptions import TimeoutException as _TimeoutException
+        from selenium.common.exceptions import NoSuchElementException as _NoSuchElementException
+        from selenium.common.exceptions import StaleElementReferenceException as _StaleElementReferenceException
+
+        # Suppress webdriver-manager logs
+        logging.getLogger('WDM').setLevel(logging.WARNING)
+        from webdriver_manager.chrome import ChromeDriverManager as _ChromeDriverManager
+
+        try:
+            import psutil as _psutil
+            psutil = _psutil
+        except ImportError:
+            pass
+
+        By, WebDriverWait, EC = _By, _WebDriverWait, _EC
+        Service, Options = _Service, _Options
+        TimeoutException, NoSuchElementException = _TimeoutException, _NoSuchElementException
+        StaleElementReferenceException = _StaleElementReferenceException
+        ChromeDriverManager = _ChromeDriverManager
+
+        # Assigned last, it is the flag that everything above is ready
+        from selenium import webdriver as _webdriver
+        webdriver = _webdriver
+
+def prewarm_browser_modules():
+    """Import the browser modules in the background while the user reads the menu"""
+    def _load():
+        try:
+            load_browser_modules()
+        except Exception:
+            # setup_driver() will import again and report the real error
+            pass
+
+    threading.Thread(target=_load, name="quickbuy-prewarm", daemon=True).start()
+
+# Resolves with [locator index, element] as soon as a locator matches an
+# attached, visible, enabled node. A MutationObserver drives the checks so
+# there is no polling delay. Alternatives are only eligible while the main
+# target is absent from the page, and only after the first graceMs, so a
+# generic alternative like //input cannot win the race against a main target
+# that is about to render or still becoming clickable. On timeout it falls
+# back to a presence-only match, like WebDriverWait did.
+WAIT_FOR_ANY_JS = """
+var locators = arguments[0];
+var timeoutMs = arguments[1];
+var graceMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var started = Date.now();
+
+function resolve(locator) {
+    try {
+        if (locator[0] === 'id') { return document.getElementById(locator[1]); }
+        if (locator[0] === 'css selector') { return document.querySelector(locator[1]); }
+        if (locator[0] === 'xpath') {
+            return document.evaluate(locator[1], document, null,
+                XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        }
+    } catch (e) {}
+    return null;
+}
+
+function interactable(el) {
+    if (!el.isConnected || el.disabled) { return false; }
+    var rect = el.getBoundingClientRect();
+    if (rect.width === 0 && rect.height === 0) { return false; }
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+}
+
+function scan(requireInteractable) {
+    var main = resolve(locators[0]);
+    if (main) {
+        // A main target that is still hidden or disabled is waited for, never skipped
+        return (!requireInteractable || interactable(main)) ? [0, main] : null;
+    }
+    if (Date.now() - started < graceMs) { return null; }
+    for (var i = 1; i < locators.length; i++) {
+        var el = resolve(locators[i]);
+        if (el && (!requireInteractable || interactable(el))) { return [i, el]; }
+    }
+    return null;
+}
+
+var found = scan(true);
+if (found) { done(found); return; }
+
+var finished = false;
+var pending = false;
+var observer = null;
+var timer = null;
+var safety = null;
+
+function finish(result) {
+    if (finished) { return; }
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    clearInterval(safety);
+    done(result);
+}
+
+function check() {
+    pending = false;
+    var result = scan(true);
+    if (result) { finish(result); }
+}
+
+observer = new MutationObserver(function () {
+    // Coalesce a burst of mutations into one scan
+    if (!pending) { pending = true; Promise.resolve().then(check); }
+});
+observer.observe(document, {
+    childList: true, subtree: true, attributes: true,
+    attributeFilter: ['style', 'class', 'hidden', 'disabled']
+});
+// Stylesheet loads and animations change visibility without a mutation,
+// and alternatives become eligible once the grace period is over
+safety = setInterval(check, 100);
+timer = setTimeout(function () { started = 0; finish(scan(true) || scan(false)); }, timeoutMs);
+"""
+
+def env_int(name, default):
+    """Read an integer setting from the environment, falling back to default"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+def wait_for_schedule(scheduled_time, lead_seconds=0):
+    """Block until lead_seconds before scheduled_time, reporting the countdown"""
+    wake_time = scheduled_time - timedelta(seconds=lead_seconds)
+    while datetime.now() < wake_time:
+        remaining = wake_time - datetime.now()
+        time.sleep(max(min(30, remaining.total_seconds()), 0))  # Check every 30 seconds
+        remaining = scheduled_time - datetime.now()
+        if remaining.total_seconds() <= 60:
+            log_event('schedule_countdown', f"Starting in {int(remaining.total_seconds())} seconds...",
+                      seconds_left=int(remaining.total_seconds()))
 
 class QuickBuyPro:
     def __init__(self):
@@ -33,6 +202,43 @@ class QuickBuyPro:
         self.user_data_dir = os.path.join(os.getcwd(), "user_data")
         self.schedule_file = "schedule.pkl"
         self.is_logged_in = False
+        self.account_url = "https://www.flipkart.com/account/?rd=0&link=home_account"
+        # Pages opened ahead of a scheduled run so DNS, TLS and caches are warm at fire time
+        self.prefetch_urls = [
+            self.account_url,
+            "https://www.flipkart.com/viewcart"
+        ]
+        self.prefetch_lead_seconds = env_int("QUICKBUY_PREFETCH_SECONDS", 60)
+        # "reload" refreshes the warm product page at fire time, "direct" clicks Buy Now on it as loaded
+        self.fire_mode = os.environ.get("QUICKBUY_FIRE_MODE", "reload").strip().lower()
+        self.prefetched_url = None
+        # Record-and-replay capture of each step's DOM (and optionally a HAR)
+        self.capture_dir = os.environ.get("QUICKBUY_CAPTURE_DIR", "").strip()
+        self.capture_har = os.environ.get("QUICKBUY_CAPTURE_HAR", "") == "1"
+        self.capture = None
+        self.current_step = None
+        self.last_match = None
+        # Failure snapshots are written by a background worker, empty disables them
+        self.diagnostics_dir = os.environ.get("QUICKBUY_DIAGNOSTICS_DIR", "diagnostics").strip()
+        self.diagnostics = None
+        self.last_error = None
+        # Elements resolved on the current page, keyed by compiled locator
+        self.element_cache = {}
+        # Per-lookup details recorded into the run history
+        self.history_db = os.environ.get("QUICKBUY_HISTORY_DB", "history.db").strip()
+        self.last_find_ms = None
+        self.last_retries = 0
+        self.popup_hits = 0
+        # Per-step element wait budgets learned from history, overridable in timeouts.json
+        self.adaptive_timeouts = os.environ.get("QUICKBUY_ADAPTIVE_TIMEOUTS", "1") != "0"
+        self.timeouts_file = os.environ.get("QUICKBUY_TIMEOUTS_FILE", "timeouts.json").strip()
+        self.step_timeouts = {}
+        # Push-based waits via an in-page MutationObserver, WebDriverWait polling is the fallback
+        self.push_waits = os.environ.get("QUICKBUY_PUSH_WAITS", "1") != "0"
+        self.script_timeout = 30  # Selenium's default async script timeout
+        self.primary_grace_ms = env_int("QUICKBUY_PRIMARY_GRACE_MS", 1000)
+        # Optional host:port of a proxy such as netem_proxy.py for slow-network testing
+        self.proxy = os.environ.get("QUICKBUY_PROXY", "").strip()
         self.step_descriptions = [
             "Opening product page",
             "Clicking Buy Now button",
@@ -74,16 +280,18 @@ class QuickBuyPro:
 
     def setup_driver(self):
         """Setup Chrome driver with user data persistence"""
+        try:
+            load_browser_modules()
+        except ImportError as e:
+            print(f"ERROR: ChromeDriver setup failed: {e}")
+            print("Try running: pip install --upgrade selenium webdriver-manager")
+            raise
         chrome_options = Options()
         
         # Clean up any existing Chrome processes and locks
         try:
-            import subprocess
-            import signal
-            
             # Try to use psutil for more aggressive process killing
-            try:
-                import psutil
+            if psutil is not None:
                 # Kill all Chrome processes more aggressively
                 for proc in psutil.process_iter(['pid', 'name']):
                     try:
@@ -91,8 +299,6 @@ class QuickBuyPro:
                             proc.kill()
                     except (psutil.NoSuchProcess, psutil.AccessDenied):
                         pass
-            except ImportError:
-                pass
             
             # Also try traditional pkill as backup
             subprocess.run(['pkill', '-f', 'chrome'], capture_output=True)
@@ -107,9 +313,6 @@ class QuickBuyPro:
         # Clean up existing user data directory only if there are conflicts
         if os.path.exists(self.user_data_dir):
             try:
-                import glob
-                import shutil
-                
                 # Check for lock files and remove them
                 lock_files = [
                     os.path.join(self.user_data_dir, "Default", "SingletonLock*"),
@@ -192,20 +395,27 @@ class QuickBuyPro:
             chrome_options.add_argument('--disable-infobars')
             chrome_options.add_argument('--disable-gpu-sandbox')
             chrome_options.add_argument('--disable-software-rasterizer')
+
+            # Route everything, including localhost fixtures, through the test proxy
+            if self.proxy:
+                chrome_options.add_argument(f"--proxy-server=http://{self.proxy}")
+                chrome_options.add_argument("--proxy-bypass-list=<-loopback>")
+
+            # Console log feeds failure diagnostics, performance log feeds the capture HAR
+            logging_prefs = {}
+            if self.diagnostics_dir:
+                logging_prefs['browser'] = 'ALL'
+            if self.capture_dir and self.capture_har:
+                logging_prefs['performance'] = 'ALL'
+            if logging_prefs:
+                chrome_options.set_capability('goog:loggingPrefs', logging_prefs)
         except Exception as e:
             pass
 
         try:
-            # Suppress webdriver-manager logs
-            import logging
-            logging.getLogger('WDM').setLevel(logging.WARNING)
-
             # Use webdriver-manager to automatically download and manage ChromeDriver
-            from webdriver_manager.chrome import ChromeDriverManager
-            
             # For ARM64 Macs, clear any corrupted cache first (silently)
             if platform.system().lower() == "darwin" and platform.machine() == "arm64":
-                import shutil
                 cache_path = os.path.expanduser("~/.wdm/drivers/chromedriver/")
                 if os.path.exists(cache_path):
                     try:
@@ -216,6 +426,8 @@ class QuickBuyPro:
             # Download and setup ChromeDriver (silently)
             service = Service(ChromeDriverManager().install())
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # A new session starts with Selenium's default async script timeout
+            self.script_timeout = 30
             
         except Exception as e:
             print(f"ERROR: ChromeDriver setup failed: {e}")
@@ -232,11 +444,11 @@ class QuickBuyPro:
         
         return self.driver
 
-    def check_login_status(self):
+    def check_login_status(self, quiet=False):
         """Check if user is logged in by visiting profile page"""
 
         try:
-            self.driver.get("https://www.flipkart.com/account/?rd=0&link=home_account")
+            self.driver.get(self.account_url)
             time.sleep(3)
 
             # Handle any popups that might appear
@@ -245,7 +457,8 @@ class QuickBuyPro:
             # Check for "Profile Information" text
             try:
                 profile_info = self.driver.find_element(By.XPATH, "//*[contains(text(), 'Profile Information')]")
-                print("User is logged in!")
+                if not quiet:
+                    print("User is logged in!")
                 self.is_logged_in = True
                 return True
             except NoSuchElementException:
@@ -254,23 +467,33 @@ class QuickBuyPro:
             # Check for login indicator class
             try:
                 login_element = self.driver.find_element(By.CLASS_NAME, "PbekyG.xrBehW")
-                print("User is logged in!")
+                if not quiet:
+                    print("User is logged in!")
                 self.is_logged_in = True
                 return True
             except NoSuchElementException:
                 pass
 
             # If neither found, user is not logged in
-            print("User is not logged in.")
-            print("Please login in the browser. System will automatically detect when you're logged in.")
+            if not quiet:
+                print("User is not logged in.")
+                print("Please login in the browser. System will automatically detect when you're logged in.")
             self.is_logged_in = False
             return False
 
         except Exception as e:
-            print(f"ERROR: Checking login status: {e}")
+            self.last_error = f"{type(e).__name__}: {e}"
+            if not quiet:
+                print(f"ERROR: Checking login status: {e}")
             self.is_logged_in = False
             return False
 
+    def start_browser_and_check_login(self):
+        """Launch the browser and probe the login state, meant for a background worker"""
+        self.setup_driver()
+        self.last_error = None
+        return self.check_login_status(quiet=True)
+
     def wait_for_login(self):
         """Continuously check for login until user logs in"""
         print("Waiting for user to login...")
@@ -310,7 +533,7 @@ class QuickBuyPro:
                 # Try refreshing account page to check again
                 current_url = self.driver.current_url
                 if "login" not in current_url.lower():
-                    self.driver.get("https://www.flipkart.com/account/?rd=0&link=home_account")
+                    self.driver.get(self.account_url)
                     time.sleep(2)
                     self.check_and_handle_popups()
 
@@ -321,8 +544,8 @@ class QuickBuyPro:
                 time.sleep(5)
                 continue
 
-    def get_user_inputs(self):
-        """Get all required inputs from user"""
+    def get_user_inputs(self, on_product_url=None):
+        """Get all required inputs from user, calling on_product_url as soon as a valid URL is entered"""
         print("\nPlease enter the product URL:")
         print("IMPORTANT NOTE: First go to product page and select all details:")
         print("   - Choose Color, Size, Variant and other options")
@@ -330,6 +553,17 @@ class QuickBuyPro:
         print("   - This ensures automation works with the correct product\n")
         product_url = input("Product URL: ").strip()
 
+        # Validate right away so a typo is caught before the card and schedule prompts
+        while product_url:
+            cleaned_url, error = self.validate_url(product_url)
+            if not error:
+                break
+            print(f"ERROR: {error}")
+            product_url = input("Product URL (or press Enter to cancel): ").strip()
+
+        if product_url and on_product_url:
+            on_product_url(product_url)
+
         print("\nCard Details (Optional):")
         print("Do you want to prefill card details? (y/n): ", end="")
         prefill_choice = input().strip().lower()
@@ -534,6 +768,61 @@ class QuickBuyPro:
         ]
         return steps
 
+    def prefetch_pages(self, product_url):
+        """Open account, checkout and product pages ahead of the scheduled time"""
+        cleaned_url, error = self.validate_url(product_url)
+        if error:
+            logger.error(f"ERROR: {error}")
+            return False
+
+        for url in self.prefetch_urls:
+            started = time.perf_counter()
+            try:
+                self.driver.get(url)
+                log_event('prefetch', f"Prefetched {url[:50]}", url=url,
+                          duration_ms=round((time.perf_counter() - started) * 1000, 1))
+            except Exception as e:
+                logger.warning(f"WARNING: Prefetch failed for {url[:50]}...: {e}")
+
+        # Product page goes last so it is the one left open for the fire step
+        return self.prefetch_product(product_url)
+
+    def prefetch_product(self, product_url):
+        """Load the product page in the running browser so the first step starts warm"""
+        cleaned_url, error = self.validate_url(product_url)
+        if error or not self.driver:
+            return False
+        try:
+            self.invalidate_element_cache()
+            self.driver.get(cleaned_url)
+            self.check_and_handle_popups()
+            self.prefetched_url = product_url
+            return True
+        except Exception as e:
+            logger.warning(f"WARNING: Prefetch failed for product page: {e}")
+            self.prefetched_url = None
+            return False
+
+    def wait_until(self, fire_time):
+        """Sleep until fire_time, spinning through the last few milliseconds"""
+        while True:
+            remaining = (fire_time - datetime.now()).total_seconds()
+            if remaining <= 0:
+                return
+            if remaining > 0.02:
+                time.sleep(remaining - 0.02)
+
+    def prepare_fire_step(self, steps):
+        """Turn the open step into a reload or a direct jump when the product page is already warm"""
+        if not steps or steps[0].get('Command') != 'open':
+            return
+        if not self.prefetched_url or steps[0].get('Target') != self.prefetched_url:
+            return
+        if self.fire_mode == 'direct':
+            steps[0]['Command'] = 'direct'
+        else:
+            steps[0]['Command'] = 'refresh'
+
     def check_and_handle_popups(self):
         """Check for common popup buttons and handle them"""
         try:
@@ -550,6 +839,8 @@ class QuickBuyPro:
                     element = self.driver.find_element(By.XPATH, selector)
                     if element.is_displayed() and element.is_enabled():
                         element.click()
+                        self.invalidate_element_cache()
+                        self.popup_hits += 1
                         time.sleep(1.5)  # Reduced from 2 seconds
                         return True
                 except:
@@ -581,25 +872,34 @@ class QuickBuyPro:
                 # Validate and clean URL before opening
                 cleaned_url, error = self.validate_url(target)
                 if error:
-                    print(f"ERROR: {error}")
+                    logger.error(f"ERROR: {error}")
                     return False
                 
                 try:
+                    self.invalidate_element_cache()
                     self.driver.get(cleaned_url)
                     time.sleep(1.5)  # Reduced from 2 seconds
                     # Check for popups after page load
                     self.check_and_handle_popups()
                 except Exception as url_error:
-                    print(f"ERROR: Failed to open URL: {url_error}")
+                    logger.error(f"ERROR: Failed to open URL: {url_error}")
                     return False
 
+            elif cmd_type == 'refresh':
+                # Product page was prefetched, a reload revalidates it against warm connections
+                self.invalidate_element_cache()
+                self.driver.refresh()
+                self.check_and_handle_popups()
+
+            elif cmd_type == 'direct':
+                # Product page was prefetched and is still loaded, go straight to Buy Now
+                pass
+
             elif cmd_type == 'click':
                 # Check for popups before important clicks
                 self.check_and_handle_popups()
 
-                element = self.find_element_by_target(target, targets)
-                if element:
-                    element.click()
+                if self.interact(target, targets, lambda element: element.click()):
                     time.sleep(0.5)  # Reduced from 1 second
                 else:
                     return False
@@ -608,9 +908,9 @@ class QuickBuyPro:
                 # Check for popups before important clicks
                 self.check_and_handle_popups()
 
-                element = self.find_element_by_target(target, targets)
-                if element:
-                    element.click()
+                if self.interact(target, targets, lambda element: element.click()):
+                    # The click is expected to load a new page
+                    self.invalidate_element_cache()
                     time.sleep(2)  # Reduced from 3 seconds
                     # Check for popups after clickAndWait since it might load new content
                     self.check_and_handle_popups()
@@ -622,17 +922,20 @@ class QuickBuyPro:
                 if not value:
                     return True
 
-                element = self.find_element_by_target(target, targets)
-                if element:
+                def type_value(element):
                     # For expiry date field, click first if needed
                     if 'div[2]/div/input' in target and 'cards' in target:
                         try:
                             element.click()
                             time.sleep(0.5)
+                        except StaleElementReferenceException:
+                            raise
                         except:
                             pass
                     element.clear()
                     element.send_keys(value)
+
+                if self.interact(target, targets, type_value):
                     time.sleep(0.5)  # Reduced from 1 second
                 else:
                     return False
@@ -640,49 +943,168 @@ class QuickBuyPro:
             return True
 
         except Exception as e:
-            print(f"ERROR: Executing command {cmd_type}: {e}")
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.error(f"ERROR: Executing command {cmd_type}: {e}")
             return False
 
-    def find_element_by_target(self, target, targets=None):
-        """Find element by target selector, try alternatives if main fails"""
-        wait = WebDriverWait(self.driver, 5)  # Reduced from 10 to 5 seconds
+    def compile_locator(self, selector):
+        """Convert a prefixed selector string into a Selenium locator tuple"""
+        if selector.startswith('xpath='):
+            return (By.XPATH, selector[len('xpath='):])
+        elif selector.startswith('id='):
+            return (By.ID, selector[len('id='):])
+        elif selector.startswith('css='):
+            return (By.CSS_SELECTOR, selector[len('css='):])
+        # Assume it's xpath if no prefix
+        return (By.XPATH, selector)
+
+    def invalidate_element_cache(self):
+        """Forget cached elements, called whenever the page changes"""
+        self.element_cache.clear()
+
+    def cached_element(self, locator):
+        """Return the cached element for a main locator if it is still attached"""
+        element = self.element_cache.get(locator)
+        if element is None:
+            return None
+        try:
+            # Single round trip, raises if the node was detached or replaced
+            element.is_enabled()
+            return element
+        except Exception:
+            # StaleElementReferenceException, or anything else wrong with the handle
+            del self.element_cache[locator]
+            return None
 
-        # Try main target first
+    def interact(self, target, targets, action):
+        """Find the element and run action on it, resolving it again once if the handle went stale"""
+        element = self.find_element_by_target(target, targets)
+        if element is None:
+            return False
         try:
-            if target.startswith('xpath='):
-                xpath = target.replace('xpath=', '')
-                return wait.until(EC.presence_of_element_located((By.XPATH, xpath)))
-            elif target.startswith('id='):
-                element_id = target.replace('id=', '')
-                return wait.until(EC.presence_of_element_located((By.ID, element_id)))
-            elif target.startswith('css='):
-                css_selector = target.replace('css=', '')
-                return wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, css_selector)))
-            else:
-                # Assume it's xpath if no prefix
-                return wait.until(EC.presence_of_element_located((By.XPATH, target)))
-        except TimeoutException:
-            pass
+            action(element)
+        except StaleElementReferenceException:
+            self.invalidate_element_cache()
+            element = self.find_element_by_target(target, targets)
+            # The stale handle counts as one more retry on top of the new lookup
+            self.last_retries += 1
+            if element is None:
+                return False
+            action(element)
+        return True
 
-        # Try alternative targets if provided
-        if targets:
-            for alt_target in targets:
+    def load_step_timeouts(self):
+        """Load learned per-step wait budgets from history, then apply overrides"""
+        self.step_timeouts = {}
+        if self.adaptive_timeouts and self.history_db and os.path.exists(self.history_db):
+            try:
+                history = RunHistory(self.history_db)
                 try:
-                    if alt_target.startswith('xpath='):
-                        xpath = alt_target.replace('xpath=', '')
-                        return wait.until(EC.presence_of_element_located((By.XPATH, xpath)))
-                    elif alt_target.startswith('id='):
-                        element_id = alt_target.replace('id=', '')
-                        return wait.until(EC.presence_of_element_located((By.ID, element_id)))
-                    elif alt_target.startswith('css='):
-                        css_selector = alt_target.replace('css=', '')
-                        return wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, css_selector)))
-                    else:
-                        return wait.until(EC.presence_of_element_located((By.XPATH, alt_target)))
+                    budgets = history.step_timeouts()
+                finally:
+                    history.close()
+                self.step_timeouts = {index: budget['timeout'] for index, budget in budgets.items()}
+            except Exception as e:
+                logger.warning(f"WARNING: Could not learn step timeouts: {e}")
+        try:
+            self.step_timeouts.update(load_timeout_overrides(self.timeouts_file))
+        except Exception as e:
+            logger.warning(f"WARNING: Ignoring invalid {self.timeouts_file}: {e}")
+        return self.step_timeouts
+
+    def step_timeout(self, step_index):
+        """Element wait budget in seconds for a step"""
+        return self.step_timeouts.get(step_index, DEFAULT_TIMEOUT)
+
+    def wait_for_any(self, locators, timeout):
+        """Wait in the page for the first locator with an interactable match
+
+        Returns (completed, index, element, wait_ms). completed is False when the
+        script could not run, so the caller should fall back to polling.
+        """
+        if timeout + 2 > self.script_timeout:
+            self.driver.set_script_timeout(timeout + 2)
+            self.script_timeout = timeout + 2
+
+        started = time.perf_counter()
+        try:
+            result = self.driver.execute_async_script(
+                WAIT_FOR_ANY_JS, [list(locator) for _, locator in locators], int(timeout * 1000),
+                min(self.primary_grace_ms, int(timeout * 1000))
+            )
+        except Exception as e:
+            # Navigation mid-wait, script timeout or a page that blocks scripts
+            log_event('push_wait_fallback', f"   Push wait unavailable, polling instead: {type(e).__name__}",
+                      error=str(e)[:200])
+            return False, None, None, 0.0
+
+        wait_ms = round((time.perf_counter() - started) * 1000, 1)
+        if not result:
+            return True, None, None, wait_ms
+        return True, result[0], result[1], wait_ms
+
+    def find_element_by_target(self, target, targets=None, timeout=None):
+        """Find element by target selector, try alternatives if main fails"""
+        load_browser_modules()
+        started = time.perf_counter()
+        if timeout is None:
+            timeout = self.step_timeout(self.current_step)
+
+        # Main target first, then alternatives, each locator only once
+        locators = []
+        for selector in [target] + list(targets or []):
+            locator = self.compile_locator(selector)
+            if locator not in [l for _, l in locators]:
+                locators.append((selector, locator))
+
+        # Only the main target may come from the cache, and only main target matches are
+        # cached, so an element found through a generic fallback is never reused by a later
+        # step in place of that step's own main target
+        selector = target
+        element = self.cached_element(locators[0][1])
+
+        self.last_retries = 0
+        # Time the matching locator itself waited, i.e. how long the element took to appear.
+        # Cache hits stay None, they say nothing about how long the page takes to render.
+        wait_ms = None
+        pushed = False
+        if element is None and self.push_waits:
+            pushed, index, element, wait_ms = self.wait_for_any(locators, timeout)
+            if element is not None:
+                selector, locator = locators[index]
+                if index == 0:
+                    self.element_cache[locator] = element
+                self.last_retries = index
+
+        if element is None and not pushed:
+            wait = WebDriverWait(self.driver, timeout)
+            for attempt, (selector, locator) in enumerate(locators):
+                wait_started = time.perf_counter()
+                try:
+                    element = wait.until(EC.presence_of_element_located(locator))
                 except TimeoutException:
                     continue
+                wait_ms = round((time.perf_counter() - wait_started) * 1000, 1)
+                if attempt == 0:
+                    self.element_cache[locator] = element
+                # Fallback locators tried before this one matched
+                self.last_retries = attempt
+                break
+
+        find_ms = round((time.perf_counter() - started) * 1000, 1)
+        if element is None:
+            self.last_match = None
+            # Censored sample: the element took at least the whole budget to appear. Recording
+            # the budget lets the learned timeout grow instead of failing the step on every run.
+            self.last_find_ms = round(timeout * 1000, 1)
+            self.last_retries = len(locators)
+            return None
 
-        return None
+        self.last_match = selector
+        self.last_find_ms = wait_ms
+        if self.capture:
+            self.capture.snapshot(self.driver, self.current_step, element, selector, find_ms)
+        return element
 
     def save_schedule(self, data):
         """Save scheduled execution data"""
@@ -707,15 +1129,20 @@ class QuickBuyPro:
     def run_automation(self, user_inputs):
         """Run the complete automation flow"""
         # Setup driver again for automation
-        print("\nStarting new browser session for automation...")
-        self.setup_driver()
+        run_id = new_run()
+        if self.driver is not None and self.driver_alive():
+            log_event('run_start', "\nReusing the warm browser session for automation...")
+        else:
+            log_event('run_start', "\nStarting new browser session for automation...")
+            self.setup_driver()
 
         steps = self.load_steps()
         if not steps:
-            print("ERROR: No steps found to execute!")
+            logger.error("ERROR: No steps found to execute!")
             return
 
-        print(f"\nStarting automation for: {user_inputs['product_url'][:50]}...")
+        log_event('automation_start', f"\nStarting automation for: {user_inputs['product_url'][:50]}...",
+                  url=user_inputs['product_url'])
 
         # Replace the first URL with user's product URL
         if steps and steps[0].get('Command') == 'open':
@@ -724,22 +1151,133 @@ class QuickBuyPro:
         # Update card details in steps
         self.update_card_details_in_steps(steps, user_inputs)
 
+        # History, capture and diagnostics touch the disk, so set them up before the fire time
+        if self.load_step_timeouts():
+            log_event('step_timeouts', "Using learned element timeouts: " + ", ".join(
+                f"step {index + 1}={seconds:.1f}s" for index, seconds in sorted(self.step_timeouts.items())
+            ), timeouts={str(index + 1): seconds for index, seconds in self.step_timeouts.items()})
+
+        if self.capture_dir:
+            secrets = [user_inputs['card_number'], user_inputs['expiry_date'], user_inputs['cvv']]
+            self.capture = StepCapture(self.capture_dir, secrets=secrets, har=self.capture_har)
+            log_event('capture_start', f"Capturing step snapshots to: {self.capture.run_dir}",
+                      capture_dir=self.capture.run_dir)
+
+        if self.diagnostics_dir:
+            secrets = [user_inputs['card_number'], user_inputs['expiry_date'], user_inputs['cvv']]
+            self.diagnostics = FailureDiagnostics(self.diagnostics_dir, secrets=secrets)
+
+        # Warm up pages ahead of a scheduled run, then fire exactly on time
+        scheduled_time = user_inputs.get('scheduled_time')
+        if scheduled_time and scheduled_time > datetime.now():
+            log_event('prefetch_start', "Prefetching product, account and checkout pages...")
+            self.prefetch_pages(user_inputs['product_url'])
+            log_event('fire_wait', f"Firing at {scheduled_time.strftime('%d/%m/%Y %H:%M:%S')}",
+                      fire_time=scheduled_time.isoformat())
+            self.wait_until(scheduled_time)
+
+        self.prepare_fire_step(steps)
+        self.invalidate_element_cache()
+
+        results = []
+        fired_at = time.time()
+        fired = time.perf_counter()
+        final_click_ms = None
+
         # Execute each step with user-friendly descriptions
         for i, step in enumerate(steps):
             if i < len(self.step_descriptions):
-                print(f"\n{i+1}. {self.step_descriptions[i]}")
+                description = self.step_descriptions[i]
             else:
-                print(f"\n{i+1}. Processing step {i+1}")
-
+                description = f"Processing step {i+1}"
+            set_step(i)
+            log_event('step_start', f"\n{i+1}. {description}", description=description,
+                      command=step.get('Command', ''))
+
+            self.current_step = i
+            self.last_match = None
+            self.last_error = None
+            self.last_find_ms = None
+            self.last_retries = 0
+            popups_before = self.popup_hits
+            started = time.perf_counter()
             success = self.execute_command(step)
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            results.append({
+                'step_index': i,
+                'description': description,
+                'command': step.get('Command', ''),
+                'success': 1 if success else 0,
+                'duration_ms': duration_ms,
+                'wait_ms': self.last_find_ms,
+                'selector': self.last_match,
+                'retries': self.last_retries,
+                'popups': self.popup_hits - popups_before
+            })
+            if success and i == len(steps) - 1:
+                final_click_ms = round((time.perf_counter() - fired) * 1000, 1)
+
+            if self.capture:
+                # Steps without an element lookup are captured once they finish
+                if not self.capture.has_snapshot(i):
+                    self.capture.snapshot(self.driver, i)
+                self.capture.record_step(i, step, description, success, duration_ms)
 
             if not success:
-                print(f"   WARNING: Step failed, continuing...")
+                if self.diagnostics:
+                    error = self.last_error or f"No element matched {step.get('Target', '')[:80]}"
+                    self.diagnostics.capture(self.driver, i, description, error)
+                log_event('step_failed', f"   WARNING: Step failed, continuing...", logging.WARNING,
+                          selector=self.last_match, duration_ms=duration_ms, error=self.last_error)
                 continue
             else:
-                print(f"   Completed")
-
-        print("\nAutomation completed successfully!")
+                log_event('step_done', f"   Completed", selector=self.last_match, duration_ms=duration_ms)
+
+        # Same start point as the time to final click, so neither includes browser startup,
+        # prefetch or the wait for the scheduled time
+        total_ms = round((time.perf_counter() - fired) * 1000, 1)
+        self.current_step = None
+        set_step(None)
+        if self.capture:
+            capture_dir = self.capture.finish()
+            log_event('capture_saved', f"\nCapture saved to: {capture_dir}", capture_dir=capture_dir)
+            self.capture = None
+        if self.diagnostics:
+            self.diagnostics.close()
+            self.diagnostics = None
+
+        self.record_history({
+            'run_id': run_id,
+            'started_at': fired_at,
+            'product_host': urllib.parse.urlparse(user_inputs['product_url']).netloc,
+            'scheduled': 1 if scheduled_time else 0,
+            'steps_ok': sum(r['success'] for r in results),
+            'steps_failed': sum(1 - r['success'] for r in results),
+            'total_ms': total_ms,
+            'time_to_final_click_ms': final_click_ms
+        }, results)
+
+        log_event('run_done', "\nAutomation completed successfully!", run_id=run_id,
+                  time_to_final_click_ms=final_click_ms)
+
+    def record_history(self, run, results):
+        """Append the run to the local history database"""
+        if not self.history_db:
+            return
+        run['host'] = platform.node()
+        try:
+            run['chrome_version'] = self.driver.capabilities.get('browserVersion')
+        except Exception:
+            run['chrome_version'] = None
+        try:
+            history = RunHistory(self.history_db)
+            try:
+                history.record_run(run, results)
+            finally:
+                history.close()
+        except Exception as e:
+            logger.warning(f"WARNING: Could not record run history: {e}")
 
     def update_card_details_in_steps(self, steps, user_inputs):
         """Update card details in automation steps"""
@@ -753,6 +1291,16 @@ class QuickBuyPro:
                 elif 'cvv-input' in target:
                     step['Value'] = user_inputs['cvv']
 
+    def driver_alive(self):
+        """Check that the browser session still responds"""
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            self.driver = None
+            self.prefetched_url = None
+            return False
+
     def close(self, logout=False):
         """Close the browser and manage user data based on logout preference"""
         if self.driver:
@@ -762,7 +1310,6 @@ class QuickBuyPro:
                 self.driver.quit()
                 # Delete user data directory on logout
                 try:
-                    import shutil
                     if os.path.exists(self.user_data_dir):
                         shutil.rmtree(self.user_data_dir)
                 except Exception as e:
@@ -772,6 +1319,26 @@ class QuickBuyPro:
                 time.sleep(2)
                 self.driver.quit()
                 print("Browser closed. User data saved!")
+            self.driver = None
+            self.prefetched_url = None
+
+def create_local_driver(headless=True, extra_args=None):
+    """Start a throwaway Chrome for offline tools, without touching the user's profile"""
+    load_browser_modules()
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--log-level=3")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
+    for arg in extra_args or []:
+        chrome_options.add_argument(arg)
+
+    service = Service(ChromeDriverManager().install())
+    return webdriver.Chrome(service=service, options=chrome_options)
 
 def check_scheduled_execution():
     """Check if there's a scheduled execution on startup"""
@@ -800,7 +1367,8 @@ def check_scheduled_execution():
 
             if choice == "2":
                 automation.clear_schedule()
-                return scheduled_data
+                # Run immediately, run_automation would otherwise wait for the old fire time
+                return dict(scheduled_data, scheduled_time=None)
             elif choice == "3":
                 automation.clear_schedule()
                 print("Scheduled execution cancelled")
@@ -810,11 +1378,8 @@ def check_scheduled_execution():
                 print("Keep this tool running. Press Ctrl+C to cancel.")
 
                 try:
-                    while datetime.now() < scheduled_time:
-                        time.sleep(30)  # Check every 30 seconds
-                        remaining = scheduled_time - datetime.now()
-                        if remaining.total_seconds() <= 60:
-                            print(f"Starting in {int(remaining.total_seconds())} seconds...")
+                    # Wake early so the browser can start and prefetch before the deadline
+                    wait_for_schedule(scheduled_time, automation.prefetch_lead_seconds)
 
                     automation.clear_schedule()
                     return scheduled_data
@@ -830,6 +1395,10 @@ def check_scheduled_execution():
     return None
 
 def main():
+    setup_logging()
+    # Selenium loads in the background while the menu and prompts are on screen
+    prewarm_browser_modules()
+
     # Check for scheduled execution first
     scheduled_data = check_scheduled_execution()
 
@@ -883,11 +1452,41 @@ def main():
                 print("ERROR: Invalid choice!")
                 return
             
-            print("\nStep 1: Checking login status...")
+            print("\nStep 1: Starting browser and checking login status in the background...")
 
-            # Setup driver and check login first
-            automation.setup_driver()
-            is_logged_in = automation.check_login_status()
+            # A single worker keeps browser tasks in order, so the driver is never used concurrently
+            browser_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quickbuy-browser")
+            login_check = browser_worker.submit(automation.start_browser_and_check_login)
+
+            def prefetch_when_entered(product_url):
+                # Queued behind the login check, skipped if the user turns out not to be logged in
+                browser_worker.submit(lambda: automation.is_logged_in and automation.prefetch_product(product_url))
+
+            print("\nStep 2: Getting automation details...")
+            try:
+                user_inputs = automation.get_user_inputs(on_product_url=prefetch_when_entered)
+            finally:
+                # Join the background startup before this thread touches the browser
+                browser_worker.shutdown(wait=True)
+            is_logged_in = login_check.result()
+
+            if not user_inputs['product_url']:
+                print("ERROR: No product URL provided!")
+                return
+
+            if not is_logged_in and automation.last_error:
+                # The background probe failed, so the login state is unknown. Probe once more
+                # here rather than discard the details the user has just entered.
+                print(f"WARNING: Checking login status failed: {automation.last_error}")
+                if not automation.driver_alive():
+                    print("ERROR: The browser is no longer running. Please try again.")
+                    return
+                print("Checking login status again...")
+                # Prints its own result, including the login prompt when not logged in
+                is_logged_in = automation.check_login_status()
+            elif not is_logged_in:
+                print("User is not logged in.")
+                print("Please login in the browser. System will automatically detect when you're logged in.")
 
             if not is_logged_in:
                 login_success = automation.wait_for_login()
@@ -896,15 +1495,9 @@ def main():
                     return
             else:
                 print("Already logged in! Proceeding...")
-                automation.close()
-
-            print("\nStep 2: Getting automation details...")
-            # Get user inputs after login is confirmed
-            user_inputs = automation.get_user_inputs()
-
-            if not user_inputs['product_url']:
-                print("ERROR: No product URL provided!")
-                return
+                if user_inputs['scheduled_time']:
+                    # The browser is started and warmed up again shortly before the scheduled time
+                    automation.close()
 
             # Handle scheduling
             if user_inputs['scheduled_time']:
@@ -915,14 +1508,11 @@ def main():
                 print("Press Ctrl+C to cancel scheduled execution")
 
                 try:
-                    while datetime.now() < user_inputs['scheduled_time']:
-                        time.sleep(30)  # Check every 30 seconds
-                        remaining = user_inputs['scheduled_time'] - datetime.now()
-                        if remaining.total_seconds() <= 60:
-                            print(f"Starting in {int(remaining.total_seconds())} seconds...")
+                    # Wake early so the browser can start and prefetch before the deadline
+                    wait_for_schedule(user_inputs['scheduled_time'], automation.prefetch_lead_seconds)
 
                     automation.clear_schedule()
-                    print("\nStarting scheduled automation...")
+                    log_event('schedule_fire', "\nStarting scheduled automation...")
                     # Continue to automation execution
 
                 except KeyboardInterrupt:
@@ -934,6 +1524,7 @@ def main():
         automation.run_automation(user_inputs)
 
         # Keep browser open for user to see result
+        flush_logging()
         input("\nAutomation completed! Press Enter to close browser...")
 
     except KeyboardInterrupt:
@@ -941,6 +1532,7 @@ def main():
     except Exception as e:
         print(f"ERROR: Unexpected error: {e}")
     finally:
+        flush_logging()
         automation.close()
 
 if __name__ == "__main__":
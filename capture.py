@@ -0,0 +1,211 @@
+"""
+QuickBuy Pro - Step capture
+Author: flenco.in
+Support: https://buymeacoffee.com/atishpaul
+
+Records sanitized DOM snapshots (and optionally a HAR of the critical
+resources) at each step boundary so runs can be replayed offline.
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+
+from run_log import logger
+
+# Attribute used to mark the element a step resolved to inside a snapshot
+TARGET_ATTRIBUTE = "data-quickbuy-target"
+
+# Serializes a scrubbed copy of the live DOM: scripts and inline handlers are
+# dropped, card fields are blanked, and the resolved element is marked.
+SANITIZE_DOM_JS = """
+var target = arguments[0];
+var marker = arguments[1];
+var stepIndex = arguments[2];
+if (target) { target.setAttribute(marker, String(stepIndex)); }
+var clone = document.documentElement.cloneNode(true);
+if (target) { target.removeAttribute(marker); }
+
+clone.querySelectorAll('script, noscript, link[rel=preload], link[rel=prefetch], link[rel=modulepreload]')
+    .forEach(function (node) { node.remove(); });
+clone.querySelectorAll('iframe').forEach(function (node) { node.removeAttribute('src'); });
+clone.querySelectorAll('*').forEach(function (node) {
+    Array.prototype.slice.call(node.attributes).forEach(function (attr) {
+        if (attr.name.toLowerCase().indexOf('on') === 0) { node.removeAttribute(attr.name); }
+    });
+});
+
+var sensitive = /(cc|card|cvv|cvc|expiry|exp-|exp_|security)/i;
+clone.querySelectorAll('input, textarea').forEach(function (node) {
+    var hint = [node.id, node.name, node.getAttribute('autocomplete'), node.getAttribute('type')].join(' ');
+    if (sensitive.test(hint) || /password/i.test(hint) || node.closest('#cards')) {
+        node.setAttribute('value', '');
+        node.textContent = '';
+    }
+});
+
+var doctype = document.doctype ? '<!DOCTYPE ' + document.doctype.name + '>' : '<!DOCTYPE html>';
+return doctype + '\\n' + clone.outerHTML;
+"""
+
+# Resource types kept in the HAR, everything else is noise for replay
+HAR_RESOURCE_TYPES = ("Document", "Script", "Stylesheet", "XHR", "Fetch")
+
+
+def redact(text, secrets):
+    """Replace the given secrets in text where they appear as a whole token
+
+    Card fields are already blanked in the page, so only standalone values
+    are replaced. A short CVV must not rewrite ids, classes or prices that
+    merely contain the same digits.
+
+    >>> redact('<div id="CNTCTC3B8D4111" class="_1111x">Rs 1,111</div> cvv=111&exp=12/28', ["111", "12 / 28"])
+    '<div id="CNTCTC3B8D4111" class="_1111x">Rs 1,111</div> cvv=[REDACTED]&exp=[REDACTED]'
+    """
+    if not text:
+        return text
+    for secret in secrets:
+        if not secret:
+            continue
+        for variant in {secret, secret.replace(" ", ""), secret.replace(" / ", "/")}:
+            if len(variant) >= 3:
+                # Not part of a longer word, id or number such as 1,111 or 111.00
+                pattern = r"(?<![\w.,])" + re.escape(variant) + r"(?!\w|[.,]\d)"
+                text = re.sub(pattern, "[REDACTED]", text)
+    return text
+
+
+class StepCapture:
+    """Write per-step DOM snapshots and a manifest for one automation run"""
+
+    def __init__(self, base_dir, secrets=None, har=False):
+        self.secrets = [s for s in (secrets or []) if s]
+        self.har = har
+        self.run_dir = os.path.join(base_dir, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.steps = {}
+
+    def has_snapshot(self, step_index):
+        """Check if a snapshot was already taken for this step"""
+        return bool(self.steps.get(step_index, {}).get('snapshot'))
+
+    def snapshot(self, driver, step_index, element=None, selector=None, find_ms=None):
+        """Save the sanitized DOM as the step sees it, marking the resolved element"""
+        if step_index is None:
+            return
+        try:
+            html = driver.execute_script(SANITIZE_DOM_JS, element, TARGET_ATTRIBUTE, step_index)
+            url = driver.current_url
+        except Exception as e:
+            logger.warning(f"WARNING: Capture failed for step {step_index + 1}: {e}")
+            return
+
+        name = f"step_{step_index + 1:02d}.html"
+        with open(os.path.join(self.run_dir, name), 'w', encoding='utf-8') as f:
+            f.write(redact(html, self.secrets))
+
+        entry = self.steps.setdefault(step_index, {})
+        entry['snapshot'] = name
+        entry['url'] = redact(url, self.secrets)
+        if selector is not None:
+            entry['matched_selector'] = selector
+            entry['find_ms'] = find_ms
+
+        if self.har:
+            self.save_har(driver, step_index)
+
+    def save_har(self, driver, step_index):
+        """Drain the performance log into a HAR of critical resources seen so far"""
+        try:
+            messages = driver.get_log('performance')
+        except Exception:
+            return
+
+        requests = {}
+        for item in messages:
+            try:
+                message = json.loads(item['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            params = message.get('params', {})
+            request_id = params.get('requestId')
+            if message.get('method') == 'Network.requestWillBeSent':
+                requests[request_id] = {
+                    'request': params.get('request', {}),
+                    'type': params.get('type'),
+                    'wallTime': params.get('wallTime'),
+                    'timestamp': params.get('timestamp')
+                }
+            elif message.get('method') == 'Network.responseReceived' and request_id in requests:
+                requests[request_id]['response'] = params.get('response', {})
+                requests[request_id]['type'] = params.get('type')
+            elif message.get('method') == 'Network.loadingFinished' and request_id in requests:
+                requests[request_id]['finished'] = params.get('timestamp')
+
+        entries = []
+        for request_id, data in requests.items():
+            response = data.get('response')
+            if not response or data.get('type') not in HAR_RESOURCE_TYPES:
+                continue
+            body = ""
+            try:
+                body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id}).get('body', "")
+            except Exception:
+                pass
+            elapsed = 0
+            if data.get('finished') and data.get('timestamp'):
+                elapsed = round((data['finished'] - data['timestamp']) * 1000, 1)
+            started = datetime.fromtimestamp(data['wallTime']).isoformat() if data.get('wallTime') else ""
+            entries.append({
+                'startedDateTime': started,
+                'time': elapsed,
+                'request': {
+                    'method': data['request'].get('method', 'GET'),
+                    'url': redact(data['request'].get('url', ''), self.secrets),
+                    'headers': []
+                },
+                'response': {
+                    'status': response.get('status', 0),
+                    'statusText': response.get('statusText', ''),
+                    'headers': [],
+                    'content': {
+                        'mimeType': response.get('mimeType', ''),
+                        'text': redact(body, self.secrets)
+                    }
+                },
+                '_resourceType': data.get('type'),
+                'timings': {'wait': elapsed}
+            })
+
+        name = f"step_{step_index + 1:02d}.har"
+        har = {'log': {'version': '1.2', 'creator': {'name': 'QuickBuy Pro', 'version': '1.0'}, 'entries': entries}}
+        with open(os.path.join(self.run_dir, name), 'w', encoding='utf-8') as f:
+            json.dump(har, f)
+        self.steps.setdefault(step_index, {})['har'] = name
+
+    def record_step(self, step_index, step, description, success, duration_ms):
+        """Record the outcome of a step for the manifest"""
+        entry = self.steps.setdefault(step_index, {})
+        entry.update({
+            'index': step_index,
+            'description': description,
+            'command': step.get('Command', ''),
+            'target': step.get('Target', ''),
+            'targets': step.get('Targets', []),
+            'value': redact(step.get('Value', ''), self.secrets),
+            'success': success,
+            'duration_ms': duration_ms
+        })
+
+    def finish(self):
+        """Write the run manifest"""
+        manifest = {
+            'captured_at': datetime.now().isoformat(),
+            'steps': [self.steps[i] for i in sorted(self.steps)]
+        }
+        for step in manifest['steps']:
+            step['target'] = redact(step.get('target', ''), self.secrets)
+        with open(os.path.join(self.run_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return self.run_dir
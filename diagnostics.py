@@ -0,0 +1,148 @@
+"""
+QuickBuy Pro - Failure diagnostics
+Author: flenco.in
+Support: https://buymeacoffee.com/atishpaul
+
+Captures a screenshot, URL, DOM and console log when a step fails. Only
+the browser round trips happen on the caller's thread; decoding,
+compression and disk writes run on a background worker.
+"""
+
+import base64
+import gzip
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+from capture import redact
+from run_log import logger
+
+# Hides the text of card and password inputs for the screenshot (arguments[0]
+# true), then puts their original inline style back (arguments[0] false)
+MASK_CARD_FIELDS_JS = """
+var mask = arguments[0];
+var saved = 'data-quickbuy-style';
+if (!mask) {
+    document.querySelectorAll('[' + saved + ']').forEach(function (node) {
+        node.setAttribute('style', node.getAttribute(saved));
+        node.removeAttribute(saved);
+    });
+    return 0;
+}
+var sensitive = /(cc|card|cvv|cvc|expiry|exp-|exp_|security|password)/i;
+var count = 0;
+document.querySelectorAll('input, textarea').forEach(function (node) {
+    var hint = [node.id, node.name, node.getAttribute('autocomplete'), node.getAttribute('type')].join(' ');
+    if (sensitive.test(hint) || node.closest('#cards')) {
+        node.setAttribute(saved, node.getAttribute('style') || '');
+        node.style.setProperty('color', 'transparent', 'important');
+        node.style.setProperty('text-shadow', 'none', 'important');
+        node.style.setProperty('-webkit-text-security', 'disc', 'important');
+        count++;
+    }
+});
+return count;
+"""
+
+
+class FailureDiagnostics:
+    """Queue failure snapshots and write them to disk off the critical path"""
+
+    def __init__(self, base_dir, secrets=None, max_pending=4):
+        self.base_dir = base_dir
+        self.secrets = [s for s in (secrets or []) if s]
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.worker = threading.Thread(target=self._run, name="quickbuy-diagnostics", daemon=True)
+        self.worker.start()
+
+    def capture(self, driver, step_index, description, error=None):
+        """Grab raw failure data from the browser and hand it to the worker"""
+        record = {
+            'time': datetime.now(),
+            'step': step_index,
+            'description': description,
+            'error': error or "",
+            'url': "",
+            'screenshot': None,
+            'dom': "",
+            'console': []
+        }
+        # Each call is a single browser round trip; anything that fails is left empty
+        try:
+            record['url'] = driver.current_url
+        except Exception:
+            pass
+        try:
+            # Card values must not end up on disk as pixels; no mask, no screenshot
+            driver.execute_script(MASK_CARD_FIELDS_JS, True)
+            try:
+                record['screenshot'] = driver.get_screenshot_as_base64()
+            finally:
+                driver.execute_script(MASK_CARD_FIELDS_JS, False)
+        except Exception:
+            pass
+        try:
+            record['dom'] = driver.page_source
+        except Exception:
+            pass
+        try:
+            record['console'] = driver.get_log('browser')
+        except Exception:
+            pass
+
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            # Never wait on the disk, a dropped capture is better than a slower retry
+            self.dropped += 1
+            return False
+
+    def close(self, timeout=10):
+        """Flush pending captures and stop the worker"""
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.worker.join(timeout)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                return
+            try:
+                self._write(record)
+            except Exception as e:
+                logger.warning(f"WARNING: Could not save failure diagnostics: {e}")
+
+    def _write(self, record):
+        stamp = record['time'].strftime("%Y%m%d-%H%M%S-%f")
+        step = record['step'] + 1 if record['step'] is not None else 0
+        folder = os.path.join(self.base_dir, f"{stamp}_step{step:02d}")
+        os.makedirs(folder, exist_ok=True)
+
+        if record['screenshot']:
+            with open(os.path.join(folder, "screenshot.png"), 'wb') as f:
+                f.write(base64.b64decode(record['screenshot']))
+
+        if record['dom']:
+            with gzip.open(os.path.join(folder, "dom.html.gz"), 'wt', encoding='utf-8') as f:
+                f.write(redact(record['dom'], self.secrets))
+
+        info = {
+            'time': record['time'].isoformat(),
+            'step': step,
+            'description': record['description'],
+            'error': redact(record['error'], self.secrets),
+            'url': redact(record['url'], self.secrets),
+            'console': [
+                {**entry, 'message': redact(entry.get('message', ''), self.secrets)}
+                for entry in record['console']
+            ]
+        }
+        with open(os.path.join(folder, "failure.json"), 'w', encoding='utf-8') as f:
+            json.dump(info, f, indent=2)
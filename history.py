@@ -0,0 +1,308 @@
+"""
+QuickBuy Pro - Run history
+Author: flenco.in
+Support: https://buymeacoffee.com/atishpaul
+
+Stores the outcome of every automation run in a local SQLite database
+and reports percentiles, trends and the slowest steps across runs.
+
+Usage:
+    python history.py report --days 7
+    python history.py timeouts
+    python history.py export-metrics /var/lib/node_exporter/textfile/quickbuy.prom
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    host TEXT,
+    chrome_version TEXT,
+    product_host TEXT,
+    scheduled INTEGER,
+    steps_ok INTEGER,
+    steps_failed INTEGER,
+    total_ms REAL,
+    time_to_final_click_ms REAL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    step_index INTEGER NOT NULL,
+    description TEXT,
+    command TEXT,
+    success INTEGER,
+    duration_ms REAL,
+    wait_ms REAL,
+    selector TEXT,
+    retries INTEGER,
+    popups INTEGER,
+    PRIMARY KEY (run_id, step_index)
+);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs(started_at);
+"""
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# Element wait budgets: p99 of observed waits times a safety factor, clamped.
+# Timed-out lookups are stored at the budget they used, so a budget that is
+# too short pushes the next one up.
+DEFAULT_TIMEOUT = 5.0
+TIMEOUT_QUANTILE = 0.99
+TIMEOUT_FACTOR = 2.0
+TIMEOUT_FLOOR = 1.0
+TIMEOUT_CEILING = 10.0
+TIMEOUT_MIN_SAMPLES = 5
+TIMEOUT_WINDOW_DAYS = 30
+
+
+def percentile(values, q):
+    """Linearly interpolated percentile of values, q between 0 and 1"""
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class RunHistory:
+    """SQLite store of per-run and per-step results"""
+
+    def __init__(self, path="history.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def record_run(self, run, steps):
+        """Insert a run dict and its list of step dicts"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (:run_id, :started_at, :host, :chrome_version, "
+                ":product_host, :scheduled, :steps_ok, :steps_failed, :total_ms, :time_to_final_click_ms)",
+                run
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO steps VALUES (:run_id, :step_index, :description, :command, "
+                ":success, :duration_ms, :wait_ms, :selector, :retries, :popups)",
+                [dict(step, run_id=run['run_id']) for step in steps]
+            )
+
+    def runs_since(self, since):
+        return self.conn.execute(
+            "SELECT * FROM runs WHERE started_at >= ? ORDER BY started_at", (since,)
+        ).fetchall()
+
+    def steps_since(self, since):
+        return self.conn.execute(
+            "SELECT steps.* FROM steps JOIN runs USING (run_id) WHERE runs.started_at >= ? "
+            "ORDER BY steps.step_index", (since,)
+        ).fetchall()
+
+    def step_stats(self, since=0):
+        """Per-step duration percentiles, success rate and most common selector"""
+        grouped = {}
+        for row in self.steps_since(since):
+            data = grouped.setdefault(row['step_index'], {
+                'description': row['description'], 'durations': [], 'waits': [],
+                'ok': 0, 'count': 0, 'retries': 0, 'popups': 0, 'selectors': {}
+            })
+            data['count'] += 1
+            data['ok'] += 1 if row['success'] else 0
+            data['retries'] += row['retries'] or 0
+            data['popups'] += row['popups'] or 0
+            if row['duration_ms'] is not None:
+                data['durations'].append(row['duration_ms'])
+            if row['wait_ms'] is not None:
+                data['waits'].append(row['wait_ms'])
+            if row['selector']:
+                data['selectors'][row['selector']] = data['selectors'].get(row['selector'], 0) + 1
+        return grouped
+
+    def step_timeouts(self, quantile=TIMEOUT_QUANTILE, factor=TIMEOUT_FACTOR, floor=TIMEOUT_FLOOR,
+                      ceiling=TIMEOUT_CEILING, min_samples=TIMEOUT_MIN_SAMPLES, days=TIMEOUT_WINDOW_DAYS):
+        """Per-step element wait budgets in seconds, learned from observed wait times"""
+        budgets = {}
+        for index, data in self.step_stats(time.time() - days * 86400).items():
+            if len(data['waits']) < min_samples:
+                continue
+            observed = percentile(data['waits'], quantile) / 1000
+            budgets[index] = {
+                'description': data['description'],
+                'samples': len(data['waits']),
+                'observed': observed,
+                'timeout': round(min(max(observed * factor, floor), ceiling), 3)
+            }
+        return budgets
+
+    def report(self, days=7):
+        """Print percentiles, a daily trend and the slowest steps"""
+        since = time.time() - days * 86400
+        runs = self.runs_since(since)
+        print(f"\nRun history - last {days} days ({len(runs)} runs)")
+        print("=" * 72)
+        if not runs:
+            print("No runs recorded yet.")
+            return
+
+        final = [r['time_to_final_click_ms'] for r in runs]
+        print("Time to final click: " + "   ".join(
+            f"p{int(q * 100)} {format_ms(percentile(final, q))}" for q in QUANTILES
+        ))
+        completed = sum(1 for value in final if value is not None)
+        print(f"Runs reaching the final click: {completed}/{len(runs)}")
+
+        print("\nDaily trend (time to final click)")
+        print(f"{'Date':<12} {'Runs':>5} {'p50':>10} {'p95':>10}")
+        by_day = {}
+        for r in runs:
+            by_day.setdefault(datetime.fromtimestamp(r['started_at']).strftime('%Y-%m-%d'), []).append(
+                r['time_to_final_click_ms'])
+        for day, values in sorted(by_day.items()):
+            print(f"{day:<12} {len(values):>5} {format_ms(percentile(values, 0.5)):>10} "
+                  f"{format_ms(percentile(values, 0.95)):>10}")
+
+        stats = self.step_stats(since)
+        print("\nSlowest steps (by p95 duration)")
+        print(f"{'Step':<5} {'p50':>10} {'p95':>10} {'Success':>8} {'Retries':>8} {'Popups':>7}  Description")
+        ranked = sorted(stats.items(), key=lambda item: percentile(item[1]['durations'], 0.95) or 0, reverse=True)
+        for index, data in ranked:
+            rate = data['ok'] / data['count'] * 100
+            print(f"{index + 1:<5} {format_ms(percentile(data['durations'], 0.5)):>10} "
+                  f"{format_ms(percentile(data['durations'], 0.95)):>10} {rate:>7.0f}% "
+                  f"{data['retries']:>8} {data['popups']:>7}  {data['description']}")
+            if data['selectors']:
+                selector = max(data['selectors'], key=data['selectors'].get)
+                print(f"      usual selector: {selector[:80]}")
+
+    def export_metrics(self, path, days=7):
+        """Write an OpenMetrics text file for the node exporter textfile collector"""
+        since = time.time() - days * 86400
+        runs = self.runs_since(since)
+        stats = self.step_stats(since)
+        lines = []
+
+        final = [r['time_to_final_click_ms'] / 1000 for r in runs if r['time_to_final_click_ms'] is not None]
+        lines.append("# HELP quickbuy_time_to_final_click_seconds Time from first step to the final payment click.")
+        lines.append("# TYPE quickbuy_time_to_final_click_seconds summary")
+        for q in QUANTILES:
+            value = percentile(final, q)
+            if value is not None:
+                lines.append(f'quickbuy_time_to_final_click_seconds{{quantile="{q}"}} {value:.6f}')
+        lines.append(f"quickbuy_time_to_final_click_seconds_count {len(final)}")
+        lines.append(f"quickbuy_time_to_final_click_seconds_sum {sum(final):.6f}")
+
+        lines.append("# HELP quickbuy_window_runs Automation runs recorded in the window.")
+        lines.append("# TYPE quickbuy_window_runs gauge")
+        lines.append(f"quickbuy_window_runs {len(runs)}")
+
+        lines.append("# HELP quickbuy_step_duration_seconds Duration of each automation step.")
+        lines.append("# TYPE quickbuy_step_duration_seconds summary")
+        for index, data in sorted(stats.items()):
+            labels = f'step="{index + 1}",description="{escape_label(data["description"])}"'
+            durations = [d / 1000 for d in data['durations']]
+            for q in QUANTILES:
+                value = percentile(durations, q)
+                if value is not None:
+                    lines.append(f'quickbuy_step_duration_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f"quickbuy_step_duration_seconds_count{{{labels}}} {len(durations)}")
+            lines.append(f"quickbuy_step_duration_seconds_sum{{{labels}}} {sum(durations):.6f}")
+
+        lines.append("# HELP quickbuy_step_success_ratio Share of runs in which the step succeeded.")
+        lines.append("# TYPE quickbuy_step_success_ratio gauge")
+        for index, data in sorted(stats.items()):
+            lines.append(f'quickbuy_step_success_ratio{{step="{index + 1}"}} {data["ok"] / data["count"]:.6f}')
+        lines.append("# EOF")
+
+        # Write then rename so the collector never reads a half-written file
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, path)
+
+
+def load_timeout_overrides(path):
+    """Read {"<step number>": seconds} overrides, keyed by the 1-based step number shown in the run log"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {int(step) - 1: float(seconds) for step, seconds in data.items()}
+
+
+def print_timeouts(budgets, overrides):
+    """Print learned and effective element wait budgets per step"""
+    print(f"\n{'Step':<5} {'Samples':>8} {'p99 wait':>10} {'Learned':>9} {'Override':>9} {'Used':>7}  Description")
+    print("-" * 72)
+    for index in sorted(set(budgets) | set(overrides)):
+        budget = budgets.get(index, {})
+        learned = budget.get('timeout')
+        override = overrides.get(index)
+        used = override if override is not None else (learned if learned is not None else DEFAULT_TIMEOUT)
+        observed = f"{budget['observed']:.3f}s" if budget else "-"
+        print(f"{index + 1:<5} {budget.get('samples', 0):>8} {observed:>10} "
+              f"{(f'{learned:.2f}s' if learned is not None else '-'):>9} "
+              f"{(f'{override:.2f}s' if override is not None else '-'):>9} {used:>6.2f}s  "
+              f"{budget.get('description', '')}")
+    print(f"\nSteps not listed use the default {DEFAULT_TIMEOUT:.1f}s until {TIMEOUT_MIN_SAMPLES} waits are recorded.")
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value / 1000:.2f}s"
+
+
+def escape_label(value):
+    return (value or "").replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QuickBuy Pro run history")
+    parser.add_argument("--db", default=os.environ.get("QUICKBUY_HISTORY_DB") or "history.db",
+                        help="History database (default history.db)")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    report = sub.add_parser("report", help="Print percentiles, trends and slowest steps")
+    report.add_argument("--days", type=int, default=7, help="Window in days (default 7)")
+
+    timeouts = sub.add_parser("timeouts", help="Show learned per-step element wait budgets")
+    timeouts.add_argument("--overrides", default=os.environ.get("QUICKBUY_TIMEOUTS_FILE") or "timeouts.json",
+                          help="JSON file of per-step overrides (default timeouts.json)")
+    timeouts.add_argument("--factor", type=float, default=TIMEOUT_FACTOR, help="Safety factor on p99 (default 2)")
+    timeouts.add_argument("--floor", type=float, default=TIMEOUT_FLOOR, help="Minimum budget in seconds")
+    timeouts.add_argument("--ceiling", type=float, default=TIMEOUT_CEILING, help="Maximum budget in seconds")
+
+    export = sub.add_parser("export-metrics", help="Write an OpenMetrics text file")
+    export.add_argument("path", help="Output file, e.g. for the node exporter textfile collector")
+    export.add_argument("--days", type=int, default=7, help="Window in days (default 7)")
+
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        parser.error(f"No history database at {args.db}")
+
+    history = RunHistory(args.db)
+    try:
+        if args.mode == "report":
+            history.report(args.days)
+        elif args.mode == "timeouts":
+            budgets = history.step_timeouts(factor=args.factor, floor=args.floor, ceiling=args.ceiling)
+            print_timeouts(budgets, load_timeout_overrides(args.overrides))
+        else:
+            history.export_metrics(args.path, args.days)
+            print(f"Metrics written to {args.path}")
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
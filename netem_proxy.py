@@ -0,0 +1,349 @@
+"""
+QuickBuy Pro - Network emulation proxy
+Author: flenco.in
+Support: https://buymeacoffee.com/atishpaul
+
+A local HTTP proxy that injects latency, jitter, bandwidth limits, 5xx
+responses and slow scripts, plus a harness that runs the step flow
+against captured fixture pages through it under each network profile.
+
+Plain HTTP requests can be delayed, throttled or failed per URL pattern.
+HTTPS goes through CONNECT tunnels, so only latency, bandwidth and a
+failed tunnel can be injected there, matched on host:port. Rules for
+script URLs therefore only slow scripts on live pages that load them
+over plain HTTP. Captured snapshots have their scripts stripped, so the
+bench adds a render-blocking fixture script to every page it serves.
+
+Usage:
+    python netem_proxy.py serve --profile 3g --port 8899
+    QUICKBUY_PROXY=127.0.0.1:8899 python automation.py
+
+    python netem_proxy.py bench captures/20261019-101500 --profiles fast,3g,sale-event
+"""
+
+import argparse
+import http.client
+import json
+import random
+import re
+import select
+import socket
+import statistics
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Built-in network profiles. Rules apply to URLs matching "pattern" (a regex),
+# adding "delay_ms" and failing with "status" for "error_rate" of requests.
+PROFILES = {
+    "fast": {
+        "latency_ms": 0, "jitter_ms": 0, "bandwidth_kbps": 0, "rules": []
+    },
+    "4g": {
+        "latency_ms": 50, "jitter_ms": 20, "bandwidth_kbps": 9000, "rules": []
+    },
+    "3g": {
+        "latency_ms": 300, "jitter_ms": 100, "bandwidth_kbps": 750, "rules": []
+    },
+    "sale-event": {
+        "latency_ms": 400, "jitter_ms": 400, "bandwidth_kbps": 2000,
+        "rules": [
+            {"pattern": r"\.js(\?|$)", "delay_ms": 2000},
+            # Live checkout pages, and any captured fixture page
+            {"pattern": r"(checkout|payments|viewcart|\.html$)", "status": 503, "error_rate": 0.1},
+        ]
+    }
+}
+
+# Render-blocking script the bench adds to every fixture page, so script rules apply
+BENCH_SCRIPT_PATH = "/quickbuy-bench.js"
+BENCH_SCRIPT = b"window.quickbuyBenchScriptLoaded = Date.now();\n"
+
+CHUNK_SIZE = 16 * 1024
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-connection", "proxy-authorization",
+              "te", "trailers", "transfer-encoding", "upgrade"}
+
+
+def load_profiles(path=None):
+    """Return the built-in profiles, extended by a JSON file of the same shape"""
+    profiles = {name: dict(profile) for name, profile in PROFILES.items()}
+    if path:
+        with open(path, encoding='utf-8') as f:
+            profiles.update(json.load(f))
+    return profiles
+
+
+class NetemProxyServer(ThreadingHTTPServer):
+    """Threaded proxy server holding the active network profile"""
+
+    daemon_threads = True
+
+    def __init__(self, address, profile):
+        super().__init__(address, NetemProxyHandler)
+        self.profile = profile
+        self.rng = random.Random()
+
+    def delay_for(self, url):
+        """Latency plus jitter plus any matching rule delay, in seconds"""
+        profile = self.profile
+        delay_ms = profile.get("latency_ms", 0)
+        jitter_ms = profile.get("jitter_ms", 0)
+        if jitter_ms:
+            delay_ms += self.rng.uniform(0, jitter_ms)
+        for rule in profile.get("rules", []):
+            if re.search(rule["pattern"], url):
+                delay_ms += rule.get("delay_ms", 0)
+        return delay_ms / 1000
+
+    def fault_for(self, url):
+        """HTTP status to fail this request with, or None"""
+        for rule in self.profile.get("rules", []):
+            if rule.get("status") and re.search(rule["pattern"], url):
+                if self.rng.random() < rule.get("error_rate", 1.0):
+                    return rule["status"]
+        return None
+
+    def throttle(self, size):
+        """Sleep long enough to send size bytes at the profile's bandwidth"""
+        kbps = self.profile.get("bandwidth_kbps", 0)
+        if kbps:
+            time.sleep(size * 8 / (kbps * 1000))
+
+
+class NetemProxyHandler(BaseHTTPRequestHandler):
+    """Forward proxy requests while applying the server's network profile"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_CONNECT(self):
+        host, _, port = self.path.partition(":")
+        time.sleep(self.server.delay_for(self.path))
+        status = self.server.fault_for(self.path)
+        if status:
+            self.send_error(status)
+            return
+        try:
+            upstream = socket.create_connection((host, int(port or 443)), timeout=30)
+        except OSError:
+            self.send_error(502)
+            return
+
+        self.send_response(200, "Connection Established")
+        self.end_headers()
+        self._tunnel(self.connection, upstream)
+
+    def _tunnel(self, client, upstream):
+        sockets = [client, upstream]
+        try:
+            while True:
+                readable, _, errored = select.select(sockets, [], sockets, 30)
+                if errored or not readable:
+                    return
+                for sock in readable:
+                    data = sock.recv(CHUNK_SIZE)
+                    if not data:
+                        return
+                    if sock is upstream:
+                        self.server.throttle(len(data))
+                        client.sendall(data)
+                    else:
+                        upstream.sendall(data)
+        except OSError:
+            return
+        finally:
+            upstream.close()
+
+    def _forward(self):
+        url = self.path
+        parsed = urllib.parse.urlsplit(url)
+        if not parsed.hostname:
+            self.send_error(400, "Proxy requests need an absolute URL")
+            return
+
+        time.sleep(self.server.delay_for(url))
+        status = self.server.fault_for(url)
+        if status:
+            self.send_error(status, "Injected by netem proxy")
+            return
+
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+        path = urllib.parse.urlunsplit(("", "", parsed.path or "/", parsed.query, ""))
+
+        connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        try:
+            upstream = connection_class(parsed.hostname, parsed.port, timeout=30)
+            upstream.request(self.command, path, body=body, headers=headers)
+            response = upstream.getresponse()
+            payload = response.read()
+        except OSError as e:
+            self.send_error(502, str(e))
+            return
+
+        self.send_response(response.status, response.reason)
+        for key, value in response.getheaders():
+            if key.lower() not in HOP_BY_HOP and key.lower() != "content-length":
+                self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        if self.command != "HEAD":
+            for offset in range(0, len(payload), CHUNK_SIZE):
+                chunk = payload[offset:offset + CHUNK_SIZE]
+                self.server.throttle(len(chunk))
+                self.wfile.write(chunk)
+        upstream.close()
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_OPTIONS = do_PATCH = _forward
+
+
+def start_proxy(profile, port=0):
+    """Run the proxy on localhost from a background thread"""
+    server = NetemProxyServer(("127.0.0.1", port), profile)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def chrome_proxy_args(address):
+    """Chrome flags that send all traffic, including localhost, through the proxy"""
+    return [f"--proxy-server=http://{address}", "--proxy-bypass-list=<-loopback>"]
+
+
+def run_benchmark(capture_dir, profile_names, profiles, iterations):
+    """Run the captured step flow through the proxy under each profile"""
+    from automation import QuickBuyPro, create_local_driver
+    from replay_server import QuietHandler, load_manifest, start_server
+
+    class BenchFixtureHandler(QuietHandler):
+        def end_headers(self):
+            # Every iteration must pay the network cost again
+            self.send_header("Cache-Control", "no-store")
+            super().end_headers()
+
+        def do_GET(self):
+            path = urllib.parse.urlsplit(self.path).path
+            if path == BENCH_SCRIPT_PATH:
+                self._send(BENCH_SCRIPT, "application/javascript")
+            elif path.endswith(".html"):
+                try:
+                    with open(self.translate_path(path), 'rb') as f:
+                        html = f.read()
+                except OSError:
+                    self.send_error(404)
+                    return
+                # The body is not parsed until the script loads, like a slow bundle on a live page
+                tag = f'<script src="{BENCH_SCRIPT_PATH}"></script>'.encode()
+                html, count = re.subn(rb"(<head[^>]*>)", lambda m: m.group(1) + tag, html, count=1, flags=re.I)
+                self._send(html if count else tag + html, "text/html; charset=utf-8")
+            else:
+                super().do_GET()
+
+        def _send(self, body, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    manifest = load_manifest(capture_dir)
+    fixtures = start_server(capture_dir, handler_class=BenchFixtureHandler)
+    base_url = f"http://127.0.0.1:{fixtures.server_address[1]}"
+    proxy = start_proxy(PROFILES["fast"])
+    address = f"127.0.0.1:{proxy.server_address[1]}"
+
+    automation = QuickBuyPro()
+    automation.driver = create_local_driver(extra_args=chrome_proxy_args(address))
+    results = {}
+
+    try:
+        for name in profile_names:
+            proxy.profile = profiles[name]
+            per_step = {}
+            for _ in range(iterations):
+                for step in manifest['steps']:
+                    if not step.get('snapshot'):
+                        continue
+                    command = {
+                        'Command': step.get('command', ''),
+                        'Target': step.get('target', ''),
+                        'Targets': step.get('targets', []),
+                        'Value': "1111" if step.get('command') == 'type' else ""
+                    }
+                    started = time.perf_counter()
+                    try:
+                        automation.driver.get(f"{base_url}/{step['snapshot']}")
+                        if command['Command'] in ('open', 'refresh', 'direct'):
+                            success = True
+                        else:
+                            success = automation.execute_command(command)
+                    except Exception:
+                        success = False
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    per_step.setdefault(step['index'], {'description': step.get('description', ''), 'times': [], 'ok': 0})
+                    per_step[step['index']]['times'].append(elapsed_ms)
+                    per_step[step['index']]['ok'] += 1 if success else 0
+            results[name] = per_step
+    finally:
+        automation.driver.quit()
+        proxy.shutdown()
+        fixtures.shutdown()
+
+    return results
+
+
+def print_benchmark(results, iterations):
+    """Print per-step time and success rate for every profile"""
+    for name, per_step in results.items():
+        print(f"\nProfile: {name}")
+        print(f"{'Step':<5} {'Median ms':>10} {'Max ms':>10} {'Success':>8}  Description")
+        print("-" * 72)
+        total = 0
+        for index in sorted(per_step):
+            data = per_step[index]
+            median = statistics.median(data['times'])
+            total += median
+            rate = data['ok'] / len(data['times']) * 100
+            print(f"{index + 1:<5} {median:>10.1f} {max(data['times']):>10.1f} {rate:>7.0f}%  {data['description']}")
+        print(f"{'Total':<5} {total:>10.1f}   ({iterations} iterations)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and fault injection proxy for QuickBuy Pro")
+    parser.add_argument("--profiles-file", help="JSON file with extra or overriding profiles")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    serve = sub.add_parser("serve", help="Run the proxy until interrupted")
+    serve.add_argument("--profile", default="3g", help="Network profile (default 3g)")
+    serve.add_argument("--port", type=int, default=8899, help="Port to listen on (default 8899)")
+
+    bench = sub.add_parser("bench", help="Run captured steps through the proxy under each profile")
+    bench.add_argument("capture_dir", help="Capture run directory containing manifest.json")
+    bench.add_argument("--profiles", default="fast,3g,sale-event", help="Comma separated profile names")
+    bench.add_argument("--iterations", type=int, default=3, help="Runs per profile (default 3)")
+
+    args = parser.parse_args()
+    profiles = load_profiles(args.profiles_file)
+
+    if args.mode == "serve":
+        server = start_proxy(profiles[args.profile], args.port)
+        print(f"Proxy with profile '{args.profile}' listening on 127.0.0.1:{server.server_address[1]}")
+        print(f"Run: QUICKBUY_PROXY=127.0.0.1:{server.server_address[1]} python automation.py")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        names = [name.strip() for name in args.profiles.split(",") if name.strip()]
+        unknown = [name for name in names if name not in profiles]
+        if unknown:
+            parser.error(f"Unknown profiles: {', '.join(unknown)}")
+        print_benchmark(run_benchmark(args.capture_dir, names, profiles, args.iterations), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+QuickBuy Pro - Offline replay server
+Author: flenco.in
+Support: https://buymeacoffee.com/atishpaul
+
+Serves a capture directory recorded with QUICKBUY_CAPTURE_DIR and
+optionally replays each step's element lookup against it.
+
+Usage:
+    python replay_server.py captures/20261019-101500
+    python replay_server.py captures/20261019-101500 --replay
+"""
+
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from capture import TARGET_ATTRIBUTE
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """Static file handler without per-request console noise"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_manifest(capture_dir):
+    """Load the manifest written by a capture run"""
+    with open(os.path.join(capture_dir, "manifest.json"), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def start_server(capture_dir, port=0, handler_class=QuietHandler):
+    """Serve capture_dir on localhost from a background thread"""
+    handler = functools.partial(handler_class, directory=capture_dir)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def replay_steps(capture_dir, base_url, driver=None):
+    """Run find_element_by_target() for every captured step and compare with production"""
+    from automation import QuickBuyPro, create_local_driver
+
+    manifest = load_manifest(capture_dir)
+    automation = QuickBuyPro()
+    automation.driver = driver or create_local_driver()
+    results = []
+
+    try:
+        for step in manifest['steps']:
+            if not step.get('snapshot') or step.get('command') == 'open':
+                continue
+
+            automation.driver.get(f"{base_url}/{step['snapshot']}")
+            started = time.perf_counter()
+            element = automation.find_element_by_target(step.get('target', ''), step.get('targets', []))
+            find_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            intended = False
+            if element is not None:
+                intended = element.get_attribute(TARGET_ATTRIBUTE) == str(step['index'])
+
+            results.append({
+                'index': step['index'],
+                'description': step.get('description', ''),
+                'recorded_ms': step.get('find_ms'),
+                'replay_ms': find_ms,
+                'recorded_selector': step.get('matched_selector'),
+                'replay_selector': automation.last_match,
+                'intended': intended
+            })
+    finally:
+        if driver is None:
+            automation.driver.quit()
+
+    return results
+
+
+def print_results(results):
+    """Print a replay comparison table"""
+    print(f"\n{'Step':<5} {'Recorded':>10} {'Replay':>10}  {'Same':<5} {'Hit':<5} Description")
+    print("-" * 72)
+    for r in results:
+        recorded = f"{r['recorded_ms']:.1f}" if r['recorded_ms'] is not None else "-"
+        same = "yes" if r['replay_selector'] == r['recorded_selector'] else "no"
+        hit = "yes" if r['intended'] else "no"
+        print(f"{r['index'] + 1:<5} {recorded:>10} {r['replay_ms']:>10.1f}  {same:<5} {hit:<5} {r['description']}")
+        if same == "no":
+            print(f"      recorded: {r['recorded_selector']}")
+            print(f"      replay:   {r['replay_selector']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve and replay QuickBuy Pro step captures")
+    parser.add_argument("capture_dir", help="Capture run directory containing manifest.json")
+    parser.add_argument("--port", type=int, default=8765, help="Port to serve on (default 8765)")
+    parser.add_argument("--replay", action="store_true", help="Replay element lookups in a headless browser and exit")
+    args = parser.parse_args()
+
+    server = start_server(args.capture_dir, args.port)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Serving {args.capture_dir} at {base_url}")
+
+    try:
+        if args.replay:
+            print_results(replay_steps(args.capture_dir, base_url))
+        else:
+            for step in load_manifest(args.capture_dir)['steps']:
+                if step.get('snapshot'):
+                    print(f"  {step['index'] + 1:>2}. {base_url}/{step['snapshot']}  ({step.get('description', '')})")
+            print("Press Ctrl+C to stop.")
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
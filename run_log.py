@@ -0,0 +1,124 @@
+"""
+QuickBuy Pro - Structured run logging
+Author: flenco.in
+Support: https://buymeacoffee.com/atishpaul
+
+Log records are put on an in-memory queue by the caller and written by a
+background listener, so a blocked stdout pipe or slow disk never stalls
+the step loop. Each record is written as a JSON line to the log file and
+as plain text to the console.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+
+logger = logging.getLogger("quickbuy")
+
+# Run-wide context stamped onto every record on the caller's thread
+_context = {'run_id': None, 'step': None}
+_queue = None
+_listener = None
+
+
+class RunContextFilter(logging.Filter):
+    """Attach monotonic time, run id and current step before the record is queued"""
+
+    def filter(self, record):
+        record.mono = time.monotonic()
+        record.run_id = _context['run_id']
+        if not hasattr(record, 'step'):
+            record.step = _context['step']
+        if not hasattr(record, 'event'):
+            record.event = None
+        if not hasattr(record, 'fields'):
+            record.fields = {}
+        return True
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record):
+        event = {
+            'ts': round(record.created, 6),
+            'mono': round(record.mono, 6),
+            'level': record.levelname,
+            'run_id': record.run_id,
+            'step': record.step,
+            'event': record.event,
+            'message': record.getMessage().strip()
+        }
+        event.update(record.fields)
+        return json.dumps(event, default=str)
+
+
+def setup_logging(log_dir=None, console=True):
+    """Route the quickbuy logger through a queue to a JSON lines file and the console"""
+    global _queue, _listener
+    if _listener:
+        return logger
+
+    log_dir = log_dir if log_dir is not None else os.environ.get("QUICKBUY_LOG_DIR", "logs")
+    handlers = []
+    if log_dir:
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            file_handler = logging.FileHandler(os.path.join(log_dir, "quickbuy.jsonl"), encoding='utf-8')
+            file_handler.setFormatter(JsonLineFormatter())
+            handlers.append(file_handler)
+        except OSError:
+            pass
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(console_handler)
+
+    _queue = queue.Queue()
+    queue_handler = logging.handlers.QueueHandler(_queue)
+    queue_handler.addFilter(RunContextFilter())
+    logger.addHandler(queue_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return logger
+
+
+def stop_logging():
+    """Drain the queue and stop the background listener"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+def flush_logging():
+    """Wait until every queued record has been written, e.g. before prompting the user"""
+    if _queue is not None and _listener is not None:
+        _queue.join()
+
+
+def new_run():
+    """Start a new run id for subsequent records"""
+    _context['run_id'] = uuid.uuid4().hex[:12]
+    _context['step'] = None
+    return _context['run_id']
+
+
+def set_step(step_index):
+    """Set the step index stamped on subsequent records"""
+    _context['step'] = step_index
+
+
+def log_event(event, message, level=logging.INFO, **fields):
+    """Log a named event with structured fields"""
+    logger.log(level, message, extra={'event': event, 'fields': fields})
@@ -0,0 +1,229 @@
+"""
+QuickBuy Pro - Selector cost analyzer
+Author: flenco.in
+Support: https://buymeacoffee.com/atishpaul
+
+Loads captured page snapshots into a headless browser and evaluates every
+locator of every step: evaluation time, match count and whether the first
+match is the element production actually used. Produces a ranked, pruned
+locator list per step.
+
+Usage:
+    python selector_analyzer.py captures/20261019-101500
+    python selector_analyzer.py captures/* --keep 3 --output selector_report.json
+"""
+
+import argparse
+import json
+import re
+
+from capture import TARGET_ATTRIBUTE
+
+# Times one locator over several repeats and reports its matches in the page
+EVALUATE_LOCATOR_JS = """
+var strategy = arguments[0];
+var value = arguments[1];
+var repeats = arguments[2];
+var marker = arguments[3];
+var stepIndex = String(arguments[4]);
+
+function first() {
+    if (strategy === 'id') { return document.getElementById(value); }
+    if (strategy === 'css selector') { return document.querySelector(value); }
+    return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+
+function all() {
+    if (strategy === 'id') { return Array.prototype.slice.call(document.querySelectorAll('[id="' + value.replace(/"/g, '\\\\"') + '"]')); }
+    if (strategy === 'css selector') { return Array.prototype.slice.call(document.querySelectorAll(value)); }
+    var snapshot = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var nodes = [];
+    for (var i = 0; i < snapshot.snapshotLength; i++) { nodes.push(snapshot.snapshotItem(i)); }
+    return nodes;
+}
+
+try {
+    var started = performance.now();
+    for (var r = 0; r < repeats; r++) { first(); }
+    var elapsed = (performance.now() - started) / repeats;
+    var nodes = all();
+    var intended = document.querySelector('[' + marker + '="' + stepIndex + '"]');
+    return {
+        ms: elapsed,
+        count: nodes.length,
+        hit: intended !== null && nodes[0] === intended,
+        error: null
+    };
+} catch (e) {
+    return {ms: 0, count: 0, hit: false, error: String(e)};
+}
+"""
+
+# Class names that look generated by a CSS-in-JS or minifying build step
+OBFUSCATED_CLASS = re.compile(r"\.(?=[A-Za-z0-9_-]*[A-Z])(?=[A-Za-z0-9_-]*[a-z])[A-Za-z0-9_-]{5,7}\b|\._[A-Za-z0-9]{4,}")
+
+
+def fragility(selector):
+    """Static fragility score of a selector; higher breaks more easily on layout changes"""
+    score = 0
+    notes = []
+    body = selector.split("=", 1)[1] if re.match(r"^(xpath|css|id)=", selector) else selector
+
+    if selector.startswith("id="):
+        return 0, notes
+
+    if selector.startswith("xpath=") or not re.match(r"^(css|id)=", selector):
+        steps = [part for part in re.split(r"/+", body) if part]
+        positional = len(re.findall(r"\[\d+\]", body))
+        if steps and len(steps) >= 5:
+            score += len(steps) - 4
+            notes.append(f"{len(steps)}-level path")
+        if positional:
+            score += positional
+            notes.append(f"{positional} positional index(es)")
+        if "[" not in body:
+            score += 5
+            notes.append("generic, no predicate")
+    else:
+        depth = body.count(">") + 1
+        nth = body.count("nth-child")
+        obfuscated = len(OBFUSCATED_CLASS.findall(body))
+        if depth >= 4:
+            score += depth - 3
+            notes.append(f"{depth}-level chain")
+        if nth:
+            score += nth
+            notes.append(f"{nth} nth-child")
+        if obfuscated:
+            score += obfuscated * 2
+            notes.append(f"{obfuscated} generated class name(s)")
+    return score, notes
+
+
+def evaluate_captures(capture_dirs, repeats, driver=None):
+    """Evaluate every locator of every captured step, aggregated per step number"""
+    from automation import QuickBuyPro, create_local_driver
+    from replay_server import load_manifest, start_server
+
+    automation = QuickBuyPro()
+    own_driver = driver is None
+    driver = driver or create_local_driver()
+    steps = {}
+
+    try:
+        for capture_dir in capture_dirs:
+            manifest = load_manifest(capture_dir)
+            server = start_server(capture_dir)
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            try:
+                for step in manifest['steps']:
+                    if not step.get('snapshot') or not step.get('matched_selector'):
+                        continue
+                    driver.get(f"{base_url}/{step['snapshot']}")
+                    entry = steps.setdefault(step['index'], {
+                        'description': step.get('description', ''), 'snapshots': 0, 'locators': {}
+                    })
+                    entry['snapshots'] += 1
+
+                    selectors = [step.get('target', '')] + list(step.get('targets', []))
+                    for selector in dict.fromkeys(s for s in selectors if s):
+                        strategy, value = automation.compile_locator(selector)
+                        result = driver.execute_script(EVALUATE_LOCATOR_JS, strategy, value, repeats,
+                                                       TARGET_ATTRIBUTE, step['index'])
+                        stats = entry['locators'].setdefault(selector, {
+                            'times': [], 'counts': [], 'hits': 0, 'runs': 0, 'errors': []
+                        })
+                        stats['runs'] += 1
+                        stats['times'].append(result['ms'])
+                        stats['counts'].append(result['count'])
+                        stats['hits'] += 1 if result['hit'] else 0
+                        if result['error']:
+                            stats['errors'].append(result['error'])
+            finally:
+                server.shutdown()
+    finally:
+        if own_driver:
+            driver.quit()
+
+    return steps
+
+
+def rank_locators(locators):
+    """Order locators: always hits, unique, least fragile, fastest"""
+    ranked = []
+    for selector, stats in locators.items():
+        score, notes = fragility(selector)
+        ranked.append({
+            'selector': selector,
+            'hit_rate': stats['hits'] / stats['runs'],
+            'max_count': max(stats['counts']),
+            'mean_ms': sum(stats['times']) / len(stats['times']),
+            'fragility': score,
+            'notes': notes,
+            'errors': stats['errors'][:1]
+        })
+    ranked.sort(key=lambda r: (-r['hit_rate'], r['max_count'] != 1, r['fragility'], r['mean_ms']))
+    return ranked
+
+
+def prune(ranked, keep):
+    """Keep locators that always hit the intended element, best first"""
+    return [r['selector'] for r in ranked if r['hit_rate'] == 1.0][:keep]
+
+
+def print_report(steps, keep):
+    """Print the ranked locators and pruned list for every step"""
+    for index in sorted(steps):
+        entry = steps[index]
+        ranked = rank_locators(entry['locators'])
+        print(f"\nStep {index + 1}: {entry['description']}  ({entry['snapshots']} snapshot(s))")
+        print(f"  {'Hit':>5} {'Matches':>8} {'µs':>8} {'Fragile':>8}  Selector")
+        for r in ranked:
+            print(f"  {r['hit_rate'] * 100:>4.0f}% {r['max_count']:>8} {r['mean_ms'] * 1000:>8.1f} {r['fragility']:>8}  "
+                  f"{r['selector'][:90]}")
+            if r['notes'] or r['errors']:
+                print(f"  {'':>32}{'; '.join(r['notes'] + r['errors'])}")
+        kept = prune(ranked, keep)
+        if kept:
+            print("  Suggested Targets:")
+            for selector in kept:
+                print(f"    {selector}")
+        else:
+            print("  No locator reliably hits the intended element, capture more runs or add a new selector.")
+
+
+def build_plan(steps, keep):
+    """Suggested Targets lists per step, keyed by step number"""
+    plan = {}
+    for index in sorted(steps):
+        ranked = rank_locators(steps[index]['locators'])
+        plan[str(index + 1)] = {
+            'description': steps[index]['description'],
+            'targets': prune(ranked, keep),
+            'ranked': ranked
+        }
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank and prune the step plan's locators against captured pages")
+    parser.add_argument("capture_dirs", nargs="+", help="Capture run directories containing manifest.json")
+    parser.add_argument("--repeats", type=int, default=50, help="Evaluations per locator for timing (default 50)")
+    parser.add_argument("--keep", type=int, default=3, help="Locators to keep per step (default 3)")
+    parser.add_argument("--output", help="Write the ranked and pruned lists as JSON")
+    args = parser.parse_args()
+
+    steps = evaluate_captures(args.capture_dirs, args.repeats)
+    if not steps:
+        print("No captured element lookups found. Record runs with QUICKBUY_CAPTURE_DIR first.")
+        return
+
+    print_report(steps, args.keep)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(build_plan(steps, args.keep), f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
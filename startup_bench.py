@@ -0,0 +1,123 @@
+"""
+QuickBuy Pro - Startup benchmark
+Author: flenco.in
+Support: https://buymeacoffee.com/atishpaul
+
+Measures how long `import automation` takes and how long it takes from
+launching automation.py until the main menu prompt appears.
+
+Usage:
+    python startup_bench.py
+    python startup_bench.py --runs 10 --max-prompt-ms 400
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, "automation.py")
+PROMPT = b"Choose option"
+
+
+def measure_import(runs):
+    """Time `import automation` in fresh interpreters, in milliseconds"""
+    code = (
+        "import time; started = time.perf_counter(); import automation; "
+        "print((time.perf_counter() - started) * 1000)"
+    )
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def heaviest_imports(limit):
+    """Return the slowest modules from -X importtime as (cumulative_us, name)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import automation"],
+                            cwd=HERE, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+            rows.append((int(cumulative), name.strip()))
+        except ValueError:
+            continue
+    return sorted(rows, reverse=True)[:limit]
+
+
+def measure_first_prompt(runs, timeout=30):
+    """Time from process launch until the main menu prompt is printed, in milliseconds"""
+    timings = []
+    for _ in range(runs):
+        # Fresh working directory so no saved schedule or profile changes the path taken
+        with tempfile.TemporaryDirectory() as workdir:
+            env = dict(os.environ, PYTHONUNBUFFERED="1", QUICKBUY_LOG_DIR="")
+            started = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, SCRIPT], cwd=workdir, env=env,
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            output = b""
+            try:
+                while PROMPT not in output:
+                    chunk = os.read(proc.stdout.fileno(), 4096)
+                    if not chunk:
+                        raise RuntimeError("automation.py exited before showing the menu")
+                    output += chunk
+                    if time.perf_counter() - started > timeout:
+                        raise RuntimeError("Timed out waiting for the menu prompt")
+                timings.append((time.perf_counter() - started) * 1000)
+                # Choose "3. Exit"
+                proc.communicate(b"3\n", timeout=timeout)
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+    return timings
+
+
+def summarize(label, timings):
+    print(f"{label:<22} median {statistics.median(timings):8.1f} ms   "
+          f"min {min(timings):8.1f} ms   max {max(timings):8.1f} ms   ({len(timings)} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark QuickBuy Pro startup")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement (default 5)")
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports to list (default 10)")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if the median import time exceeds this")
+    parser.add_argument("--max-prompt-ms", type=float, help="Fail if the median time-to-first-prompt exceeds this")
+    args = parser.parse_args()
+
+    import_times = measure_import(args.runs)
+    prompt_times = measure_first_prompt(args.runs)
+
+    print("\nStartup benchmark")
+    print("=" * 60)
+    summarize("Import automation", import_times)
+    summarize("Time to first prompt", prompt_times)
+
+    print(f"\nHeaviest imports (cumulative):")
+    for cumulative, name in heaviest_imports(args.top):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if args.max_import_ms is not None and statistics.median(import_times) > args.max_import_ms:
+        print(f"\nREGRESSION: import time above {args.max_import_ms} ms")
+        failed = True
+    if args.max_prompt_ms is not None and statistics.median(prompt_times) > args.max_prompt_ms:
+        print(f"\nREGRESSION: time to first prompt above {args.max_prompt_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())